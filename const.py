@@ -4,8 +4,12 @@
 """CONSTANTS."""
 
 
+from types import MappingProxyType
+
 OUTPUT_DIR_NAME = "output"
 TEMPLATES_DIR_NAME = "templates"
+COMPILED_TEMPLATES_NAME = "templates.zip"
+JINJA_CACHE_DIR_NAME = ".jinja_cache"
 TEST_SCENARIO_DIR = "tests_scenario_data_{id}"
 
 SDET_CURRENT_RUN_TEMPLATE_NAME = "sdet_run_layout.html"
@@ -14,7 +18,11 @@ TEST_SCENARIO_TEMPLATE = "test_scenario_layout.html"
 
 SQLITE_DB = 'sdet.db'
 
-SECTION_CONTENT = {
-    'current_run_html_page_title': "SDET Summary Test Report Details",
-    'summary_info_table_header_title': "SDET Summary Test Report"
-}
+CURRENT_RUN_HTML_PAGE_TITLE = "SDET Summary Test Report Details"
+SUMMARY_INFO_TABLE_HEADER_TITLE = "SDET Summary Test Report"
+
+# Read-only view: the section content is never meant to be changed at runtime
+SECTION_CONTENT = MappingProxyType({
+    'current_run_html_page_title': CURRENT_RUN_HTML_PAGE_TITLE,
+    'summary_info_table_header_title': SUMMARY_INFO_TABLE_HEADER_TITLE
+})
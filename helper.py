@@ -4,18 +4,88 @@
 """Helper module."""
 
 
-class Colors(object):
-    """Color class for pretty print in TTY."""
+import os
+import sys
 
-    HEADER = '\033[95m'
-    OKBLUE = '\033[94m'
-    OKGREEN = '\033[92m'
-    WARNING = '\033[93m'
-    FAIL = '\033[91m'
-    ENDC = '\033[3m'
-    BOLD = '\033[1m'
-    UNDERLINE = '\033[4m'
-    ITALIC = "\033[3m"
+from functools import lru_cache
+from types import SimpleNamespace
+# User defined modules
+from const import TEST_SCENARIO_DIR
+
+
+# Escape codes only make sense on a terminal: redirected/CI output gets the plain text
+_IS_TTY = hasattr(sys.stdout, 'isatty') and sys.stdout.isatty()
+
+
+def _painter(*codes, end: str = ''):
+    """Build a function that wraps a text in the given escape codes.
+    :param codes: Escape codes to prepend [str]
+    :param end: Escape code to append [str]
+    :return: Function taking the text to wrap; returns the text unchanged when not on a TTY
+    """
+
+    if not _IS_TTY:
+        return str
+
+    prefix = ''.join(codes)
+
+    def paint(text: str) -> str:
+        return prefix + text + end
+
+    return paint
+
+
+# Color escape codes for pretty print in TTY
+HEADER = '\033[95m'
+OKBLUE = '\033[94m'
+OKGREEN = '\033[92m'
+WARNING = '\033[93m'
+FAIL = '\033[91m'
+ENDC = '\033[0m'
+BOLD = '\033[1m'
+UNDERLINE = '\033[4m'
+ITALIC = '\033[3m'
+
+# Compatibility namespace for 'Colors.FAIL' style callers, plus pre-built wrappers, e.g.: Colors.fail("text")
+Colors = SimpleNamespace(
+    HEADER=HEADER, OKBLUE=OKBLUE, OKGREEN=OKGREEN, WARNING=WARNING, FAIL=FAIL, ENDC=ENDC, BOLD=BOLD,
+    UNDERLINE=UNDERLINE, ITALIC=ITALIC,
+    header=_painter(HEADER, end=ENDC),
+    ok_blue=_painter(OKBLUE, end=ENDC),
+    ok_green=_painter(OKGREEN, end=ENDC),
+    warning=_painter(WARNING, end=ENDC),
+    fail=_painter(FAIL, end=ENDC),
+    bold_ok_blue=_painter(BOLD, OKBLUE, end=ENDC),
+    bold_fail=_painter(BOLD, FAIL, end=ENDC)
+)
+
+
+# Bytes variants of the codes 'emit()' writes straight to the binary stdout buffer
+HEADER_B = HEADER.encode('ascii')
+ENDC_B = ENDC.encode('ascii')
+
+
+def emit(color: bytes, msg) -> None:
+    """Write a colored line straight to the binary stdout buffer, skipping the text layer.
+    :param color: Escape code(s) to start the line with (e.g.: HEADER_B) [bytes]
+    :param msg: Message to write
+    """
+
+    buffer = getattr(sys.stdout, 'buffer', None)
+    if buffer is None:
+        print(msg)
+        return
+
+    # Keep the order with whatever was already written through print()
+    sys.stdout.flush()
+
+    if _IS_TTY:
+        buffer.write(b''.join((color, str(msg).encode('utf-8', 'replace'), ENDC_B, b'\n')))
+    else:
+        buffer.write(str(msg).encode('utf-8', 'replace') + b'\n')
+
+
+_MISSING = object()
 
 
 def search_dict_for_value(value_to_search, key_to_search, dkt: dict):
@@ -27,7 +97,18 @@ def search_dict_for_value(value_to_search, key_to_search, dkt: dict):
 
     for key, values in dkt.items():
         if not isinstance(values, dict):
-            return False
+            continue
 
-        if value_to_search == values.get(key_to_search):
+        value = values.get(key_to_search, _MISSING)
+        if value is value_to_search or value == value_to_search:
             return key
+
+
+@lru_cache(maxsize=1024)
+def scenario_dir(run_id, output_dir: str = '') -> str:
+    """Get the (memoized) path to the tests scenario directory of a run.
+    :param run_id: ID of the run (e.g.: its time stamp)
+    :param output_dir: Directory to join the tests scenario directory to; relative path if empty [str]
+    :return: Path to the tests scenario directory [str]
+    """
+    return os.path.join(output_dir, TEST_SCENARIO_DIR.format(id=run_id))
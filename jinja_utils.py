@@ -4,17 +4,76 @@
 """Jinja2 Utils module."""
 
 
-from jinja2 import nodes, Undefined
+import logging
+import os
+import zlib
+
+from jinja2 import (
+    nodes, ChoiceLoader, Environment, FileSystemBytecodeCache, FileSystemLoader, ModuleLoader, select_autoescape,
+    Undefined
+)
 from jinja2.exceptions import TemplateRuntimeError
-from jinja2.ext import Extension
+from jinja2.ext import do, loopcontrols, Extension
+# User defined modules
+from const import COMPILED_TEMPLATES_NAME, JINJA_CACHE_DIR_NAME, OUTPUT_DIR_NAME, TEMPLATES_DIR_NAME
+from helper import emit, HEADER_B
+
+
+_logger = logging.getLogger("sdet")
 
 
 class SilentUndefined(Undefined):
     """Don`t break page-loads because vars aren`t there!"""
 
+    __slots__ = ()
+
+    # Every undefined var behaves the same, so they all share one instance
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        # Looked up on the class itself: a subclass must not get the instance of its parent
+        instance = cls.__dict__.get('_instance')
+        if instance is None:
+            instance = cls._instance = super().__new__(cls)
+            # Initialized once, without any hint/object/name: the shared instance must not keep those alive
+            Undefined.__init__(instance)
+        return instance
+
+    def __init__(self, *args, **kwargs):
+        """Nothing to set up per miss: see '__new__()'."""
+
+    def __getattr__(self, name):
+        if name[:2] == '__':
+            raise AttributeError(name)
+        # Chained lookups/calls stay undefined (e.g.: 'foo.bar is defined' is False, 'default' filter applies)
+        return self
+
+    def __getitem__(self, key):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __html__(self):
+        return str(self)
+
     def _fail_with_undefined_error(self, *args, **kwargs):
-        """Raise an error if a var is undefined."""
-        raise ValueError('JINJA2: something was undefined!')
+        """Any operation on an undefined var renders as an empty string (no exception is built)."""
+        return ''
+
+    # The base class binds its operators to its own '_fail_with_undefined_error': rebind them to ours
+    __add__ = __radd__ = __sub__ = __rsub__ = __mul__ = __rmul__ = __div__ = __rdiv__ = __truediv__ = \
+        __rtruediv__ = __floordiv__ = __rfloordiv__ = __mod__ = __rmod__ = __pow__ = __rpow__ = __pos__ = \
+        __neg__ = __lt__ = __le__ = __gt__ = __ge__ = _fail_with_undefined_error
+
+    def __int__(self):
+        return 0
+
+    def __float__(self):
+        return 0.0
+
+    def __complex__(self):
+        return 0j
 
 
 class RaiseExtension(Extension):
@@ -24,6 +83,8 @@ class RaiseExtension(Extension):
 
     # This is our keyword(s) set:
     tags = (['raise'])
+    # Name of the method the "raise" tag is compiled into a call of
+    raise_method = '_raise'
 
     # See also: jinja2.parser.parse_include()
     def parse(self, parser):
@@ -43,10 +104,14 @@ class RaiseExtension(Extension):
         # Extract the message from the template
         message_node = parser.parse_expression()
 
-        return nodes.CallBlock(
-            self.call_method('_raise', [message_node], lineno=line_no), [], [], [], lineno=line_no
+        # Same node 'self.call_method()' would build, without its generic argument handling
+        call_node = nodes.Call(
+            nodes.ExtensionAttribute(self.identifier, self.raise_method, lineno=line_no),
+            [message_node], [], None, None, lineno=line_no
         )
 
+        return nodes.CallBlock(call_node, [], [], [], lineno=line_no)
+
     def _raise(self, msg, caller):
         raise TemplateRuntimeError(msg)
 
@@ -54,9 +119,131 @@ class RaiseExtension(Extension):
 class PrintOnConsole(object):
     """DEBUG utils for printing on screen/console."""
 
+    __slots__ = ()
+
     @staticmethod
     def debug(text):
         """Debug method to print text on screen/console.
+        Does nothing (not even stringify the text) unless the 'sdet' logger is enabled for DEBUG.
         :param text: Text to print
         """
-        print(text)
+        if _logger.isEnabledFor(logging.DEBUG):
+            emit(HEADER_B, text)
+
+
+####################################################################################################
+# Shared template environment (see 'get_environment()'): every template is loaded, parsed and compiled
+# only once per process. The compiled bytecode is also persisted on disk, so later runs skip the parser
+# entirely. If the templates were compiled ahead-of-time (see 'compile_templates()') those are used instead.
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, TEMPLATES_DIR_NAME)
+COMPILED_TEMPLATES = os.path.join(BASE_DIR, COMPILED_TEMPLATES_NAME)
+JINJA_CACHE_DIR = os.path.join(BASE_DIR, OUTPUT_DIR_NAME, JINJA_CACHE_DIR_NAME)
+
+# Whitespace control, set once for all templates
+TEMPLATE_SYNTAX_OPTIONS = {
+    'trim_blocks': True,
+    'lstrip_blocks': True,
+    'keep_trailing_newline': False
+}
+# Jinja keys its bytecode cache on the template source only: tag the cache files with the options too
+_TEMPLATE_OPTIONS_TAG = '{:08x}'.format(zlib.crc32(repr(sorted(TEMPLATE_SYNTAX_OPTIONS.items())).encode()))
+
+_ENV = None
+
+
+def compiled_templates_up_to_date() -> bool:
+    """Check if the ahead-of-time compiled templates exist and are newer than all template sources
+    and than this module (which holds the template options).
+    :return: True, if the compiled templates can be used
+             False, otherwise
+    """
+
+    try:
+        compiled_mtime = os.path.getmtime(COMPILED_TEMPLATES)
+    except OSError:
+        return False
+
+    # Missing sources (e.g.: only the compiled templates are shipped, frozen executable): the archive is authoritative
+    try:
+        if os.path.getmtime(os.path.realpath(__file__)) > compiled_mtime:
+            return False
+    except OSError:
+        pass
+
+    try:
+        with os.scandir(TEMPLATES_DIR) as entries:
+            return all(entry.stat().st_mtime <= compiled_mtime for entry in entries if entry.is_file())
+    except OSError:
+        return True
+
+
+def get_environment() -> Environment:
+    """Get the shared template environment; it is created on first use.
+    :return: Template environment
+    """
+
+    global _ENV
+    if _ENV is not None:
+        return _ENV
+
+    loader = FileSystemLoader(TEMPLATES_DIR)
+    if compiled_templates_up_to_date():
+        # Fall back to the sources for any template missing from the archive
+        loader = ChoiceLoader([ModuleLoader(COMPILED_TEMPLATES), loader])
+
+    try:
+        os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    except OSError as err:
+        # Not fatal: the templates are just compiled from source on every run
+        print("Could not create the templates cache dir: '{dir}'\n\t{err}".format(dir=JINJA_CACHE_DIR, err=err))
+        bytecode_cache = None
+    else:
+        bytecode_cache = FileSystemBytecodeCache(
+            directory=JINJA_CACHE_DIR, pattern='__jinja2_%s_{tag}.cache'.format(tag=_TEMPLATE_OPTIONS_TAG)
+        )
+
+    _ENV = Environment(
+        autoescape=select_autoescape(['html']),
+        loader=loader,
+        bytecode_cache=bytecode_cache,
+        extensions=[do, loopcontrols, RaiseExtension],
+        undefined=SilentUndefined,
+        auto_reload=False,
+        cache_size=-1,
+        **TEMPLATE_SYNTAX_OPTIONS
+    )
+    # Shared by all templates, set up once
+    _ENV.globals['zip'] = zip
+    _ENV.filters['debug'] = PrintOnConsole.debug
+
+    return _ENV
+
+
+def get_template(template_name: str = None):
+    """Get a compiled template from the shared template environment.
+    :param template_name: Name of the template file [str]
+    :return: Compiled template
+    """
+    return get_environment().get_template(template_name)
+
+
+def compile_templates() -> None:
+    """Compile all templates ahead-of-time into a zip of Python modules, loaded by the template environment."""
+    get_environment().overlay(loader=FileSystemLoader(TEMPLATES_DIR)).compile_templates(
+        target=COMPILED_TEMPLATES, zip='deflated', log_function=print, ignore_errors=False
+    )
+
+
+####################################################################################################
+def main():
+    """The main function."""
+    compile_templates()
+
+
+####################################################################################################
+# Standard boilerplate to call the main() function to begin the program.
+# This only runs if the module was *not* imported.
+#
+if __name__ == '__main__':
+    main()
@@ -55,30 +55,36 @@ __copyright__ = "2019. All right reserved"
 
 
 import datetime
+import logging
 import os
-import re
 import shutil
 import sqlite as sql
 import sys
 
 from collections import defaultdict, OrderedDict
-from glob import glob
-from json import dumps, loads
+from functools import lru_cache
+from itertools import starmap
+from json import dumps
 from time import time
 from traceback import format_exc
 from typing import Union
 # User defined modules
 from const import (
-    OUTPUT_DIR_NAME, TEMPLATES_DIR_NAME, TEST_SCENARIO_DIR, TEST_SCENARIO_TEMPLATE, SDET_CURRENT_RUN_TEMPLATE_NAME,
-    SDET_MAIN_TEMPLATE_NAME, SECTION_CONTENT, SQLITE_DB
+    CURRENT_RUN_HTML_PAGE_TITLE, OUTPUT_DIR_NAME, TEST_SCENARIO_TEMPLATE,
+    SDET_CURRENT_RUN_TEMPLATE_NAME, SDET_MAIN_TEMPLATE_NAME, SQLITE_DB, SUMMARY_INFO_TABLE_HEADER_TITLE
 )
-from helper import Colors
-from jinja_utils import PrintOnConsole, RaiseExtension, SilentUndefined
+from helper import Colors, scenario_dir
+from jinja_utils import get_environment
+
+try:
+    # Optional: faster JSON parser
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 try:
     import htmlmin
-    from jinja2 import Environment, FileSystemLoader, select_autoescape, TemplateNotFound, TemplateSyntaxError
-    from jinja2.ext import do, loopcontrols
+    from jinja2 import TemplateNotFound, TemplateSyntaxError
     from docopt import docopt
 except Exception as error:
     print("\n\tError! Could not import some library: {err}".format(err=error))
@@ -86,30 +92,95 @@ except Exception as error:
     sys.exit(1)
 
 
-CONFIG = defaultdict(OrderedDict)
+_logger = logging.getLogger("sdet")
+
+CONFIG: dict = {}
 LINE_SEP = os.linesep
+TOOL_NAME = __tool__.upper()
+# Flags to (re)create an output page; binary mode matters on Windows only
+WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+# Whitespace a TAP line may use instead of plain spaces, mapped to a space (see 'classify_tap_scenarios()')
+TAP_WHITESPACE = str.maketrans('\t\r\v\f', '    ')
+# Test statuses whose tests get a scenario page per platform (see 'requirement_2()')
+TEST_STATUSES_DETAILED = ('failed', 'successful')
+
+
+####################################################################################################
+# Report type specific part of the rendering context: one straight-line builder per report type,
+# picked once per page via '_BUILDERS'. Keys returned here override the common part of the context.
+def _build_ctx_1(input_data_dkt: dict) -> dict:
+    """Context of the current run report (report type 1).
+    :param input_data_dkt: All tests data [dict]
+    :return: Report type specific context [dict]
+    """
+    return {
+        'all_platforms_id': ", ".join(input_data_dkt.get('all_platforms_id', [])),
+        'tests': input_data_dkt,
+        'tests_scenario_dir': scenario_dir(CONFIG.get('time_stamp', ''))
+    }
+
+
+def _build_ctx_2(input_data_dkt: dict) -> dict:
+    """Context of a test scenario report (report type 2).
+    :param input_data_dkt: Test data on one platform [dict]
+    :return: Report type specific context [dict]
+    """
+    test_name = input_data_dkt.get('test_name')
+    title = (test_name or "").split(".")[0].upper()
+    return {
+        'page_title': "{0} Summary Test Report".format(title),
+        'summary_info_table_header_title': "{0} Summary Test Report".format(test_name or ""),
+        'test': input_data_dkt.get('platform_status'),
+        'test_name': test_name,
+        'platform_id': input_data_dkt.get('platform_id')
+    }
+
+
+def _build_ctx_3(input_data_dkt: dict) -> dict:
+    """Context of the product history report (report type 3).
+    :param input_data_dkt: All runs data of the product [dict]
+    :return: Report type specific context [dict]
+    """
+    product_name = input_data_dkt.get('product_name', "")
+    title = "Product {0} Summary Tests Report".format(product_name)
+    return {
+        'page_title': title,
+        'summary_info_table_header_title': title,
+        'data': input_data_dkt.get('data', {}),
+        'product_name': product_name
+    }
+
+
+_BUILDERS = {
+    1: _build_ctx_1,
+    2: _build_ctx_2,
+    3: _build_ctx_3
+}
 
 
 ####################################################################################################
 class GenerateHTMLUtils(object):
     """HTML utils class."""
 
-    def __init__(self, product: str = None, output_dir: str = None, template_env=None) -> None:
+    # Fixed set of (name-mangled) attributes: no per-instance '__dict__'
+    __slots__ = (
+        '_GenerateHTMLUtils__output_dir', '_GenerateHTMLUtils__template_environment', '_GenerateHTMLUtils__templates'
+    )
+
+    def __init__(self, output_dir: str = None, template_env=None) -> None:
         """GenerateHTMLUtils class constructor.
         :param template_env: template Environment used by Jinja2
-        :param product: Product name [str]
         :param output_dir: Tests data dict [str]
         """
 
         if not template_env:
             raise ValueError("No Template Environment supplied!")
 
-        self.__product = product
         self.__output_dir = output_dir
 
         self.__template_environment = template_env
-        self.__template_environment.globals.update(zip=zip)
-        self.__template_environment.filters['debug'] = PrintOnConsole.debug
+        # Compiled templates, by file name
+        self.__templates = dict()
 
     @property
     def output_dir(self) -> str:
@@ -123,16 +194,25 @@ class GenerateHTMLUtils(object):
         """
         self.__output_dir = value
 
-    @property
-    def product(self) -> str:
-        """Get the product name."""
-        return self.__product
-
     @property
     def template_environment(self):
         """Get the template env."""
         return self.__template_environment
 
+    ################################################################################################
+    def _get_template(self, template_filename: str = None):
+        """Get a compiled template; memoized per instance, so repeated renders skip the environment lookup.
+        :param template_filename: Template file to load [str]
+        :return: Compiled template
+        """
+
+        template = self.__templates.get(template_filename)
+        if template is None:
+            template = self.template_environment.get_template(template_filename)
+            self.__templates[template_filename] = template
+
+        return template
+
     ################################################################################################
     def render_template(self, template_filename=None, context: dict = None):
         """Render the template.
@@ -146,37 +226,33 @@ class GenerateHTMLUtils(object):
         if not self.template_environment or not template_filename or not context:
             return
 
+        # Loading/compiling errors: the template file is the culprit
         try:
-            render = self.template_environment.get_template(template_filename).render(context)
+            template = self._get_template(template_filename)
         except TemplateNotFound:
-            print(
-                'Error loading "{0}": not found'.format(
-                    self.template_environment.get_or_select_template(template_filename))
-            )
+            print('Error loading "{0}": not found'.format(template_filename))
             return False
         except TemplateSyntaxError as e:
-            print(
-                'Error loading "{0}": {1}, line {2}'.format(
-                    self.template_environment.get_or_select_template(template_filename), e, e.lineno)
-            )
+            print('Error loading "{0}": {1}, line {2}'.format(template_filename, e, e.lineno))
             return False
         except IOError as e:
-            print(
-                'Error loading "{0}": {1}'.format(self.template_environment.get_or_select_template(template_filename),
-                                                  e.strerror)
-            )
+            print('Error loading "{0}": {1}'.format(template_filename, e.strerror))
             return False
-        except:  # noqa: E722
+
+        # Rendering errors: most likely the context
+        try:
+            render = template.render(context)
+        except Exception:
             # Custom error handling
             print(
                 "\tUnknown error when trying to render template '{template}'"
-                "{line_sep}{line_sep{err}{line_sep}"
+                "{line_sep}{line_sep}{err}{line_sep}"
                 "{line_sep}\tPlease check the context that JINJA2 has to render!"
                 "{line_sep}\tContext: {context}".format(
                     line_sep=LINE_SEP,
-                    template=self.template_environment.get_or_select_template(template_filename),
+                    template=template_filename,
                     err=format_exc(),
-                    context=dumps(context, indent=8)
+                    context=dumps(context, indent=8, default=str)
                 )
             )
             return False
@@ -209,27 +285,18 @@ class GenerateHTMLUtils(object):
                                                                                                    msg=rendered_html)
                 )
                 return False
-
-            try:
-                rendered_html.encode('utf-8')
-            except AttributeError:
-                print(
-                    "{line_sep}Error when encoding the template with 'utf-8'! "
-                    "Going on without encoding in 'utf-8'".format(line_sep=LINE_SEP)
-                )
-            except Exception as exc_err:
-                print(
-                    "{line_sep}Unknown error when encoding the template with 'utf-8'!"
-                    "{line_sep}Error: {err}"
-                    "{line_sep}Going on without encoding in 'utf-8'".format(line_sep=LINE_SEP, err=exc_err)
-                )
         except Exception as except_err:
             print("{line_sep}Error when rendering the template: '{err}'".format(line_sep=LINE_SEP, err=except_err))
             return False
 
-        html_page = os.path.join(self.output_dir, html_page_name)
-        with open(html_page, 'w') as file_handle:
-            file_handle.write(str(rendered_html))
+        # Write the whole (UTF-8 encoded) page straight to a raw file descriptor: no buffered writer in between
+        data = memoryview(rendered_html.encode('utf-8'))
+        fd = os.open(os.path.join(self.output_dir, html_page_name), WRITE_FLAGS, 0o666)
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
 
         return True
 
@@ -264,56 +331,21 @@ class GenerateHTMLUtils(object):
         report_date = datetime.date.today()
         current_year = datetime.datetime.now().year
 
-        page_title = SECTION_CONTENT.get('current_run_html_page_title')
-        summary_info_table_header_title = SECTION_CONTENT.get('summary_info_table_header_title')
-
-        summary_info_table_header_title = summary_info_table_header_title
-        if report_type == 2:
-            page_title = "{0} Summary Test Report".format(input_data_dkt.get('test_name', "").split(".")[0].upper())
-            summary_info_table_header_title = "{0} Summary Test Report".format(input_data_dkt.get('test_name', ""))
-        if report_type == 3:
-            page_title = "Product {0} Summary Tests Report".format(input_data_dkt.get('product_name', ""))
-            summary_info_table_header_title = (
-                "Product {0} Summary Tests Report".format(input_data_dkt.get('product_name', ""))
-            )
-
-        to_render = {
-            'page_title': page_title,
-            'summary_info_table_header_title': summary_info_table_header_title,
+        base_to_render = {
+            'page_title': CURRENT_RUN_HTML_PAGE_TITLE,
+            'summary_info_table_header_title': SUMMARY_INFO_TABLE_HEADER_TITLE,
             'report_date': str(report_date),
             'copyright': (
                 'Copyright {year} PDC. '
                 'Presence of a copyright notice is not an acknowledgement of publication.'.format(year=current_year)
             ),
-            'tool': __tool__.upper(),
+            'tool': TOOL_NAME,
             'tool_version': __version__
         }
 
-        if report_type == 1:
-            to_render.update(
-                {
-                    'all_platforms_id': ", ".join(input_data_dkt.get('all_platforms_id', [])),
-                    'tests': input_data_dkt,
-                    'tests_scenario_dir': 'tests_scenario_data_{id}'.format(id=CONFIG.get('time_stamp', ''))
-                }
-            )
-
-        if report_type == 2:
-            to_render.update(
-                {
-                    'test': input_data_dkt.get('platform_status'),
-                    'test_name': input_data_dkt.get('test_name'),
-                    'platform_id': input_data_dkt.get('platform_id')
-                }
-            )
-
-        if report_type == 3:
-            to_render.update(
-                {
-                    'data': input_data_dkt.get('data', {}),
-                    'product_name': input_data_dkt.get('product_name', "")
-                }
-            )
+        # Built in a single merge: common part + report type specific part
+        build_ctx = _BUILDERS.get(report_type)
+        to_render = {**base_to_render, **build_ctx(input_data_dkt)} if build_ctx else base_to_render
 
         if debug:
             # ------------------------------- START of context validation ------------------------------- #
@@ -373,17 +405,13 @@ def banner() -> None:
 
 
 ####################################################################################################
-def check_path(path: str = None) -> Union[None, bool]:
+def check_path(path: str) -> bool:
     """Check if the tool can chdir to script base directory.
     :param path: Full path to script base directory [str]
     :return: True, on success
              False, on failure
-             None, if wrong input
     """
 
-    if not path:
-        return
-
     try:
         os.chdir(path)
     except Exception as err:
@@ -394,14 +422,15 @@ def check_path(path: str = None) -> Union[None, bool]:
 
 
 ####################################################################################################
-def set_input_variables(product_name: str = None, test_suites_dir: str = None, report_type: str = None,
-                        path_to_output_dir: str = None, verbose: dict = None) -> None:
+def set_input_variables(product_name: str, test_suites_dir: str, report_type: int, path_to_output_dir: str,
+                        verbose: dict, config: dict) -> None:
     """Parse user input and overwrite defaults.
     :param product_name: Name of the product [str]
     :param test_suites_dir: Path to the TS dir [str]
-    :param report_type: Type of the report [str]
-    :param path_to_output_dir: Relative path to 'output' directory [str]
+    :param report_type: Type of the report [int]
+    :param path_to_output_dir: Relative path to 'output' directory; None for the default one [str]
     :param verbose: Print verbose [dict]
+    :param config: Configuration to fill in (updated in place) [dict]
     :return: None
     """
 
@@ -422,8 +451,7 @@ def set_input_variables(product_name: str = None, test_suites_dir: str = None, r
         print("{line_sep}No product name supplied or arg is empty{line_sep}".format(line_sep=LINE_SEP))
         sys.exit(1)
 
-    global CONFIG
-    CONFIG['product_name'] = product_name
+    config['product_name'] = product_name
 
     # Current directory with absolute full PATH to current script
     path = os.path.dirname(os.path.realpath(__file__))
@@ -433,10 +461,10 @@ def set_input_variables(product_name: str = None, test_suites_dir: str = None, r
         print("Exiting! ...")
         sys.exit(1)
 
-    CONFIG['path'] = path
+    config['path'] = path
 
     # Get output directory name
-    CONFIG['output_dir'] = os.path.normpath(os.path.join(path, OUTPUT_DIR_NAME))
+    config['output_dir'] = os.path.normpath(os.path.join(path, OUTPUT_DIR_NAME))
 
     # Get output directory full PATH
     if path_to_output_dir:
@@ -450,7 +478,7 @@ def set_input_variables(product_name: str = None, test_suites_dir: str = None, r
             print("Exiting! ...")
             sys.exit(1)
 
-        CONFIG['output_dir'] = os.getcwd()
+        config['output_dir'] = os.getcwd()
 
     # Get TS directory full PATH
     if not test_suites_dir:
@@ -467,44 +495,41 @@ def set_input_variables(product_name: str = None, test_suites_dir: str = None, r
         print("Exiting! ...")
         sys.exit(1)
 
-    CONFIG['test_suites_dir'] = os.getcwd()
+    config['test_suites_dir'] = os.getcwd()
 
     if not report_type:
         print("No report type supplied!{line_sep}Exiting! ...".format(line_sep=LINE_SEP))
         sys.exit(1)
 
-    CONFIG['report_type'] = report_type
+    config['report_type'] = report_type
 
     if verbose_ok:
         print(
             "{line_sep}{ch_format}{line_sep}Options after parsing{line_sep}".format(line_sep=LINE_SEP,
                                                                                     ch_format=("*" * 80))
         )
-        print("\tProduct Name{line_sep}\t\t{p_n}".format(line_sep=LINE_SEP, p_n=CONFIG['product_name']))
-        print("\tReport Type{line_sep}\t\t{r_t}".format(line_sep=LINE_SEP, r_t=CONFIG['report_type']))
-        print("\tTest_Suites_dir{line_sep}\t\t{ts_dir}".format(line_sep=LINE_SEP, ts_dir=CONFIG['test_suites_dir']))
-        print("\tOutput_dir{line_sep}\t\t{o_dir}".format(line_sep=LINE_SEP, o_dir=CONFIG['output_dir']))
+        print("\tProduct Name{line_sep}\t\t{p_n}".format(line_sep=LINE_SEP, p_n=config['product_name']))
+        print("\tReport Type{line_sep}\t\t{r_t}".format(line_sep=LINE_SEP, r_t=config['report_type']))
+        print("\tTest_Suites_dir{line_sep}\t\t{ts_dir}".format(line_sep=LINE_SEP, ts_dir=config['test_suites_dir']))
+        print("\tOutput_dir{line_sep}\t\t{o_dir}".format(line_sep=LINE_SEP, o_dir=config['output_dir']))
         print("{line_sep}{ch_format}{line_sep}".format(line_sep=LINE_SEP, ch_format=("*" * 80)))
 
 
 ####################################################################################################
-def json_to_dict(json_file: str = None) -> Union[None, bool, dict]:
+def json_to_dict(json_file: str) -> Union[bool, dict]:
     """Transform a JSON file into a dictionary.
     :param json_file: Full path to the JSON file [string]
-    :return: None, no input file
-             False, on error/ JSON file is empty
+    :return: False, on error/ JSON file is empty
              Dict, if could load the JSON file content
     """
 
-    if not json_file:
-        return
-
     if not os.path.isfile(json_file):
         return False
 
     try:
-        with open(json_file) as fd_in:
-            json_data = loads(fd_in.read())
+        # Raw bytes: the parser decodes the UTF-8 itself, no intermediate 'str' copy of the file
+        with open(json_file, 'rb') as fd_in:
+            json_data = json_loads(fd_in.read())
     except ValueError as exc_error:  # includes JSONDecodeError
         print(
             "Error whe trying to load JSON file: '{file}'{line_sep}{err}".format(file=json_file, line_sep=LINE_SEP,
@@ -527,34 +552,60 @@ def json_to_dict(json_file: str = None) -> Union[None, bool, dict]:
 
 
 ####################################################################################################
-def aggregate_all_data(main_dkt: dict = None, tests_dkt: dict = None) -> Union[None, dict]:
+def iter_platform_tests(json_files: list):
+    """Parse the platform JSON files one at a time.
+    Only the tests list of a file is handed out: the rest of its decoded content can be freed right away.
+    :param json_files: Full paths to the JSON files [list]
+    :return: Generator of (platform ID, platform tests) tuples
+             The platform tests are False if the JSON file could not be loaded
+    """
+
+    # Bound once, used for every file
+    basename = os.path.basename
+    splitext = os.path.splitext
+
+    for json_file in json_files:
+        # Remove extension from file name
+        platform_id, _ = splitext(basename(json_file))
+
+        platform_tests_data = json_to_dict(json_file=json_file)
+        if not platform_tests_data:
+            yield platform_id, False
+            continue
+
+        platform_tests = platform_tests_data.get('data', [])
+        # Do not keep the whole decoded file alive while suspended
+        del platform_tests_data
+
+        yield platform_id, platform_tests
+
+
+####################################################################################################
+def aggregate_all_data(main_dkt: dict, tests_dkt: list) -> dict:
     """Compound the main dictionary holding all data from all JSONs.
     :param main_dkt: Main dictionary to be updated [dict]
-    :param tests_dkt: All platform tests [dict]
-    :return: None, no valid input
-             Modified dict, on success
+    :param tests_dkt: All platform tests [list]
+    :return: Modified dict
     """
 
-    if not tests_dkt:
-        return
+    # Bound once, used for every record
+    basename = os.path.basename
+    intern = sys.intern
 
     for test in tests_dkt:
-        test_name = os.path.basename(test.get('sr_test_name', ""))
+        # Interned: the same names are looked up again for every platform JSON and every requirement
+        test_name = intern(basename(test.get('sr_test_name', "")))
         platform_id = test.get("sr_ts_id")
+        if isinstance(platform_id, str):
+            platform_id = intern(platform_id)
         status = 'OK' if test.get("sr_tests_failed", 0) == 0 else "FAILED"
 
-        test.update({'status': status})
+        # Read later on by requirement_1()
+        test['status'] = status
 
-        if test_name in main_dkt:
-            if status == "FAILED" and main_dkt[test_name]['status'] != "FAILED":
-                main_dkt[test_name]['status'] = "FAILED"
-
-            main_dkt[test_name]['platforms_id'].update(
-                {
-                    platform_id: test
-                }
-            )
-        else:
+        # Single lookup for both the 'new test' and the 'known test' cases
+        entry = main_dkt.get(test_name)
+        if entry is None:
             main_dkt[test_name] = {
                 'name': test_name,
                 'status': status,
@@ -562,125 +613,142 @@ def aggregate_all_data(main_dkt: dict = None, tests_dkt: dict = None) -> Union[N
                     platform_id: test
                 }
             }
+            continue
+
+        if status == "FAILED":
+            entry['status'] = "FAILED"
+
+        entry['platforms_id'][platform_id] = test
 
     return main_dkt
 
 
 ####################################################################################################
-def requirement_1(platforms_dkt_data: dict = None, tests_status_dkt: dict = None) -> None:
+def requirement_1(platforms_dkt_data: dict, tests_status_dkt: dict) -> None:
     """Requirement 1.
     :param platforms_dkt_data: All formatted data read from JSON files [dict]
     :param tests_status_dkt: All tests status dict [dict]
     """
 
-    if not platforms_dkt_data:
-        return
-
     for test_name, test_values in platforms_dkt_data.items():
-        platform_info = defaultdict(OrderedDict)
-        for platform_id, platform_data in test_values.get('platforms_id').items():
-            platform_info['status'].update({platform_id: platform_data.get('status')})
-
-        test_info = {
-            'status': test_values.get('status'),
-            'platforms_id': platform_info
+        status = test_values.get('status')
+        bucket = 'failed' if status == "FAILED" else 'successful'
+
+        tests_status_dkt[bucket][test_name] = {
+            'status': status,
+            'platforms_id': {
+                'status': {
+                    platform_id: platform_data.get('status')
+                    for platform_id, platform_data in test_values.get('platforms_id').items()
+                }
+            }
         }
 
-        if test_values.get('status') == "FAILED":
-            if not tests_status_dkt['failed'].get(test_name):
-                tests_status_dkt['failed'].update({test_name: test_info})
-            else:
-                tests_status_dkt['failed'][test_name] = test_info
-        else:
-            if not tests_status_dkt['successful'].get(test_name):
-                tests_status_dkt['successful'].update({test_name: test_info})
-            else:
-                tests_status_dkt['successful'][test_name] = test_info
+
+####################################################################################################
+@lru_cache(maxsize=1024)
+def classify_tap_scenarios(sr_tap: str = "") -> dict:
+    """Sort the scenario lines of a TAP output by their status.
+    Each scenario line goes to exactly one bucket: 'skipped' wins over 'not_ok', then 'ok'.
+    Memoized: a test passing the same way on several platforms has the very same TAP output.
+    The result is shared between those platforms, so it must not be modified.
+    :param sr_tap: TAP output of a test [str]
+    :return: Scenario lines by status ('ok', 'not_ok', 'skipped') [dict]
+    """
+
+    all_scenarios = defaultdict(list)
+    # Plain prefix/substring checks: no regex needed for the fixed TAP markers
+    for line in sr_tap.split('\n'):
+        # Any whitespace counts as a separator (e.g.: the '\r' of CRLF output, tabs)
+        probe = line.translate(TAP_WHITESPACE)
+        if '# SKIP ' in probe:
+            all_scenarios['skipped'].append(line)
+        elif ' - ' in probe:
+            # Subtests are indented; 'not ok' must be checked first, as it ends in 'ok'
+            status = probe.lstrip()
+            if status.startswith('not ok '):
+                all_scenarios['not_ok'].append(line)
+            elif status.startswith('ok '):
+                all_scenarios['ok'].append(line)
+
+    return all_scenarios
 
 
 ####################################################################################################
-def requirement_2(platforms_dkt_data: dict = None, tests_detailed_info_dkt: dict = None) -> Union[None, bool]:
+def requirement_2(platforms_dkt_data: dict, tests_detailed_info_dkt: dict) -> bool:
     """Requirement 2.
     :param platforms_dkt_data: All formatted data read from JSON files [dict]
     :param tests_detailed_info_dkt: All tests status dict [dict]
-    :return:
+    :return: True, on success
     """
 
-    if not platforms_dkt_data:
-        return
+    # Only these statuses get detailed info: look them up directly instead of scanning all keys
+    for test_status in TEST_STATUSES_DETAILED:
+        bucket = tests_detailed_info_dkt.get(test_status, {})
 
-    for test_status in tests_detailed_info_dkt:
-        if test_status not in ['failed', 'successful']:
-            continue
-
-        for test_name, test_values in tests_detailed_info_dkt.get(test_status, {}).items():
+        for test_name, test_values in bucket.items():
             platforms_ids = test_values.get('platforms_id', {}).get('status')
+            # Resolved once per test, not once per platform and field
+            platforms_data = platforms_dkt_data[test_name]['platforms_id']
+            platforms_run_status = test_values.setdefault('platforms_run_status', {})
 
             for platform_id in platforms_ids:
-                sr_tap = (
-                    platforms_dkt_data.get(test_name, {}).get('platforms_id', {}).get(platform_id, {}).get('sr_tap')
-                )
+                platform_data = platforms_data[platform_id]
 
-                total_tests = int(
-                    platforms_dkt_data.get(
-                        test_name, {}).get('platforms_id', {}).get(platform_id, {}).get('sr_test_cases', 0)
-                )
-                failed_tests = int(
-                    platforms_dkt_data.get(
-                        test_name, {}).get('platforms_id', {}).get(platform_id, {}).get('sr_tests_failed', 0)
-                )
+                sr_tap = platform_data.get('sr_tap') or ""
+                total_tests = int(platform_data.get('sr_test_cases', 0))
+                failed_tests = int(platform_data.get('sr_tests_failed', 0))
                 passed_tests = total_tests - failed_tests
 
-                # Split by new-line
-                all_scenarios = defaultdict(list)
-                for test_scenario in sr_tap.split('\n'):
-                    # Check for OK tests
-                    if re.search(r'ok [0-9]+ -\s', test_scenario):
-                        all_scenarios['ok'].append(test_scenario)
-
-                    # Check for NOT OK tests
-                    if re.search(r'not ok [0-9]+ -\s', test_scenario):
-                        all_scenarios['not_ok'].append(test_scenario)
-
-                    # Check for NOT OK tests
-                    if re.search(r'# SKIP\s', test_scenario):
-                        all_scenarios['skipped'].append(test_scenario)
-
-                if 'platforms_run_status' not in tests_detailed_info_dkt[test_status][test_name]:
-                    tests_detailed_info_dkt[test_status][test_name].update(
-                        {
-                            'platforms_run_status': {
-                                platform_id: {
-                                    'scenarios': all_scenarios,
-                                    'total_tests': total_tests,
-                                    'passed_tests': passed_tests,
-                                    'failed_tests': failed_tests
-                                }
-                            }
-                        }
-                    )
-                else:
-                    tests_detailed_info_dkt[test_status][test_name]['platforms_run_status'].update(
-                        {
-                            platform_id: {
-                                'scenarios': all_scenarios,
-                                'total_tests': total_tests,
-                                'passed_tests': passed_tests,
-                                'failed_tests': failed_tests
-                            }
-                        }
-                    )
+                platforms_run_status[platform_id] = {
+                    'scenarios': classify_tap_scenarios(sr_tap),
+                    'total_tests': total_tests,
+                    'passed_tests': passed_tests,
+                    'failed_tests': failed_tests
+                }
 
     return True
 
 
+####################################################################################################
+@lru_cache(maxsize=None)
+def _html_utils(output_dir: str) -> GenerateHTMLUtils:
+    """Get the (shared) HTML utils writing into a directory.
+    :param output_dir: Output directory [str]
+    :return: HTML utils
+    """
+    return GenerateHTMLUtils(template_env=get_environment(), output_dir=output_dir)
+
+
+def _render_one(test_name: str, platform_id: str, platform_status_data: dict, output_dir: str) -> tuple:
+    """Generate the HTML5 page of a test scenario on a platform.
+    :param test_name: Name of the test [str]
+    :param platform_id: ID of the platform [str]
+    :param platform_status_data: Run status of the test on the platform [dict]
+    :param output_dir: Output directory [str]
+    :return: (Status returned by 'generate_html()', test name) [tuple]
+    """
+
+    status = _html_utils(output_dir).generate_html(
+        html_page_name="{f_name}_{platform_id}.html".format(f_name=test_name.lower(), platform_id=platform_id),
+        html_template=TEST_SCENARIO_TEMPLATE,
+        input_data_dkt={
+            'test_name': test_name,
+            'platform_id': platform_id,
+            'platform_status': platform_status_data
+        },
+        report_type=2
+    )
+
+    return status, test_name
+
+
 ####################################################################################################
 def main(docopt_args=None) -> None:
     """The main function.
     :param docopt_args: Arguments from 'docopt'
     """
 
-    global CONFIG
     CONFIG['time_stamp'] = int(time())
 
     # Show the banner()
@@ -707,7 +775,11 @@ def main(docopt_args=None) -> None:
         path_to_output_dir = docopt_args['--path_to_output_dir']
 
     if '--debug' in docopt_args and docopt_args['--debug']:
-        debug = docopt_args['--debug']
+        debug = docopt_args['--debug'].strip().lower() == 'true'
+
+    # Configured once: errors are always reported, debug output (of this tool only) on request
+    logging.basicConfig(format='%(message)s')
+    _logger.setLevel(logging.DEBUG if debug else logging.INFO)
 
     if '--verbose' in docopt_args and docopt_args['--verbose']:
         verbose = {
@@ -720,13 +792,18 @@ def main(docopt_args=None) -> None:
                         test_suites_dir=test_suites_dir,
                         report_type=report_type,
                         path_to_output_dir=path_to_output_dir,
-                        verbose=verbose)
-
-    # Get path to JSON files
-    json_files_path = os.path.join(CONFIG['test_suites_dir'], "*.json")
-    # Get all JSON files
-    json_files = glob(json_files_path)
-    if len(json_files) == 0:
+                        verbose=verbose,
+                        config=CONFIG)
+
+    # Get all JSON files (hidden ones excluded and case-insensitive on Windows, as '*.json' globbing does)
+    normcase = os.path.normcase
+    # The directory entries already tell the file type: no extra stat() per file
+    with os.scandir(CONFIG['test_suites_dir']) as entries:
+        json_files = [
+            entry.path for entry in entries
+            if normcase(entry.name).endswith('.json') and not entry.name.startswith('.') and entry.is_file()
+        ]
+    if not json_files:
         print("No JSON files to parse in directory: '{dir}'".format(dir=CONFIG['test_suites_dir']))
         sys.exit(1)
 
@@ -734,43 +811,32 @@ def main(docopt_args=None) -> None:
     platforms_dkt_data = OrderedDict()
 
     generate_html = GenerateHTMLUtils(
-        template_env=Environment(autoescape=select_autoescape(['html']),
-                                 loader=FileSystemLoader(os.path.join(CONFIG['path'], TEMPLATES_DIR_NAME)),
-                                 extensions=[do, loopcontrols, RaiseExtension],
-                                 undefined=SilentUndefined,
-                                 trim_blocks=False),
-        product=product_name,
+        template_env=get_environment(),
         output_dir=CONFIG['output_dir']
     )
 
     # ------------------------------------------- Task 1 ------------------------------------------------------------- #
     if report_type in [1, 2]:
-        # Parse all JSON files
-        for json_file in json_files:
-            path_base_name = os.path.basename(json_file)
-
-            # Remove extension from file name
-            platform_id, _ = os.path.splitext(path_base_name)
-
+        # Parse the JSON files one at a time
+        for platform_id, platform_tests in iter_platform_tests(json_files=json_files):
             # Get all parsed platform IDs
             all_platforms_id.append(platform_id)
 
-            # Get data from JSON file
-            platform_tests_data = json_to_dict(json_file=json_file)
-            if not platform_tests_data:
+            if platform_tests is False:
                 print("Could not transform JSON file to dict!")
                 sys.exit(1)
 
-            # Aggregate read data into main dictionary
-            form_main_dkt = aggregate_all_data(tests_dkt=platform_tests_data.get('data', []),
-                                               main_dkt=platforms_dkt_data)
-            if not form_main_dkt:
+            # e.g.: '"data": null' or no tests at all: nothing to aggregate
+            if not platform_tests or not isinstance(platform_tests, list):
                 print(
                     "{line_sep}Could not format main dictionary.{line_sep}Exiting! ...".format(
                         line_sep=LINE_SEP)
                 )
                 sys.exit(1)
 
+            # Aggregate read data into main dictionary
+            aggregate_all_data(tests_dkt=platform_tests, main_dkt=platforms_dkt_data)
+
         tests_status_dkt = defaultdict(dict)
 
         requirement_1(platforms_dkt_data=platforms_dkt_data, tests_status_dkt=tests_status_dkt)
@@ -778,22 +844,9 @@ def main(docopt_args=None) -> None:
             print("{line_sep}Could not get status data.{line_sep}Exiting! ...".format(line_sep=LINE_SEP))
             sys.exit(1)
 
-        # Using OrderedDict() + sorted() sort dictionary by key
-        # Alphabetically sort 'failed' tests
-        tmp_dict = OrderedDict()
-        for key in sorted(tests_status_dkt.get('failed', {})):
-            tmp_dict.update(
-                {key: tests_status_dkt.get('failed', {}).get(key)}
-            )
-        tests_status_dkt['failed'] = tmp_dict
-
-        # Alphabetically sort 'successful' tests
-        tmp_dict = OrderedDict()
-        for key in sorted(tests_status_dkt.get('successful', {})):
-            tmp_dict.update(
-                {key: tests_status_dkt.get('successful', {}).get(key)}
-            )
-        tests_status_dkt['successful'] = tmp_dict
+        # Alphabetically sort 'failed' and 'successful' tests (dicts keep the insertion order)
+        tests_status_dkt['failed'] = dict(sorted(tests_status_dkt.get('failed', {}).items()))
+        tests_status_dkt['successful'] = dict(sorted(tests_status_dkt.get('successful', {}).items()))
 
         tests_status_dkt['all_platforms_id'] = all_platforms_id
 
@@ -807,12 +860,11 @@ def main(docopt_args=None) -> None:
         )
         if status:
             print(
-                Colors.BOLD + Colors.OKBLUE + "\tSuccessfully generated HTML file!" + Colors.ENDC +
-                Colors.WARNING + "\n\t\tPlease check output directory: '{dir}'".format(dir=CONFIG['output_dir']) +
-                Colors.ENDC
+                Colors.bold_ok_blue("\tSuccessfully generated HTML file!") +
+                Colors.warning("\n\t\tPlease check output directory: '{dir}'".format(dir=CONFIG['output_dir']))
             )
         else:
-            print(Colors.BOLD + Colors.FAIL + "\tNo HTML file generated!" + Colors.ENDC)
+            print(Colors.bold_fail("\tNo HTML file generated!"))
             print("\nExiting! ...")
             sys.exit(1)
 
@@ -822,17 +874,18 @@ def main(docopt_args=None) -> None:
         all_tests = len(tests_status_dkt['failed']) + len(tests_status_dkt['successful'])
         failed_tests = len(tests_status_dkt['failed'])
 
-        values_to_insert = (
-            os.path.join(
+        values_to_insert = sql.SdetRow(
+            detail_info=os.path.join(
                 CONFIG['output_dir'], "SDET_SummaryTestReport_{id}.html".format(id=CONFIG.get('time_stamp', ''))),
-            all_tests,
-            failed_tests,
-            ', '.join(all_platforms_id),
-            run_status
+            no_of_executed_tests=all_tests,
+            no_of_failed_tests=failed_tests,
+            list_of_ids=', '.join(all_platforms_id),
+            run_status=run_status
         )
 
         sqlite_obj = sql.Sqlite(sqlite_file=os.path.join(CONFIG['output_dir'], SQLITE_DB))
         insert_status = sqlite_obj.insert_into_db(values_to_insert=values_to_insert)
+        sqlite_obj.close()
         if insert_status is False:
             print(
                 "Error when trying to insert values into database table."
@@ -858,52 +911,26 @@ def main(docopt_args=None) -> None:
             )
             sys.exit(1)
 
-        # Create the directory if it does not exist
-        tests_scenario_data_dir = os.path.join(
-            CONFIG['output_dir'], TEST_SCENARIO_DIR.format(id=CONFIG.get('time_stamp', ''))
-        )
-        if not os.path.isdir(tests_scenario_data_dir):
-            os.makedirs(tests_scenario_data_dir)
-
-        # Delete dir content data (from previous runs). Do not delete root dir
-        for path in os.listdir(tests_scenario_data_dir):
-            path = os.path.join(tests_scenario_data_dir, path)
-            try:
-                if os.path.isfile(path):
-                    os.remove(path)
-                else:
-                    shutil.rmtree(path)
-            except Exception as exc:
-                print(exc)
+        # Start from an empty directory: drop any data from previous runs in one go, then (re)create it
+        tests_scenario_data_dir = scenario_dir(CONFIG.get('time_stamp', ''), CONFIG['output_dir'])
+        shutil.rmtree(tests_scenario_data_dir, ignore_errors=True)
+        os.makedirs(tests_scenario_data_dir, exist_ok=True)
 
-        # Set new output path
-        generate_html.output_dir = tests_scenario_data_dir
-
-        for test_status in tests_status_dkt:
-            if test_status not in ['failed', 'successful']:
-                continue
-
-            for test_name, test_values in tests_status_dkt.get(test_status, {}).items():
-                platforms_status_data = test_values.get('platforms_run_status', {})
-
-                for platform_id, platform_status_data in platforms_status_data.items():
-                    # Generate HTML5 page
-                    status = generate_html.generate_html(
-                        html_page_name="{f_name}_{platform_id}.html".format(f_name=test_name.lower(),
-                                                                            platform_id=platform_id),
-                        html_template=TEST_SCENARIO_TEMPLATE,
-                        input_data_dkt={
-                            'test_name': test_name,
-                            'platform_id': platform_id,
-                            'platform_status': platform_status_data
-                        },
-                        report_type=2
-                    )
-                    if not status:
-                        print(
-                            Colors.BOLD + Colors.FAIL +
-                            "\tNo HTML file generated for test '{t_n}'!".format(t_n=test_name) + Colors.ENDC
-                        )
+        # One page per (test, platform): collect them all in a single pass, then render them
+        jobs = [
+            (test_name, platform_id, platform_status_data, tests_scenario_data_dir)
+            for test_status in TEST_STATUSES_DETAILED
+            for test_name, test_values in tests_status_dkt.get(test_status, {}).items()
+            for platform_id, platform_status_data in test_values.get('platforms_run_status', {}).items()
+        ]
+
+        # Looped over in C: no per-page lookup of the render function
+        results = starmap(_render_one, jobs)
+
+        # A single report of all failures; a test failing on several platforms is named once
+        failed = dict.fromkeys(test_name for status, test_name in results if not status)
+        if failed:
+            print(Colors.bold_fail("\tNo HTML file generated for tests: {t_n}!".format(t_n=", ".join(failed))))
 
     # ------------------------------------------- Task 3 ------------------------------------------------------------- #
     if report_type == 3:
@@ -911,11 +938,10 @@ def main(docopt_args=None) -> None:
         # Form the SQL query
         sql_query = "SELECT * FROM SDET"
         # Fetch data from SQL table
-        db_data = sqlite_obj.query_db(sql_query=sql_query)
+        db_data = sqlite_obj.iter_query_db(sql_query=sql_query) or ()
         data_to_render = dict()
-        if not db_data:
-            print("Could not fetch data from SQLite DB!")
 
+        # Rows are streamed from the DB: only the data to render is kept
         for db_entry in db_data:
             entry_id = db_entry[0]
 
@@ -930,6 +956,10 @@ def main(docopt_args=None) -> None:
                     }
                 }
             )
+        sqlite_obj.close()
+
+        if not data_to_render:
+            print("Could not fetch data from SQLite DB!")
 
         # Set new output path
         generate_html.output_dir = CONFIG['output_dir']
@@ -945,17 +975,19 @@ def main(docopt_args=None) -> None:
             report_type=3
         )
         if not status:
-            print(Colors.BOLD + Colors.FAIL + "\tNo HTML file generated!" + Colors.ENDC)
+            print(Colors.bold_fail("\tNo HTML file generated!"))
             print("\nExiting! ...")
             sys.exit(1)
 
     # ------------------------------------------- DEBUG -------------------------------------------------------------- #
-    if debug:
-        import pprint
-
-        pp = pprint.PrettyPrinter(indent=4)
-        pp.pprint(platforms_dkt_data)
-        pp.pprint(tests_status_dkt)
+    # Walking (and formatting) the whole data only pays off if it is actually logged
+    if _logger.isEnabledFor(logging.DEBUG):
+        from pprint import pformat
+
+        _logger.debug("platforms_dkt_data:\n%s", pformat(platforms_dkt_data, indent=4))
+        # Only the reports built from the JSON files have a tests status
+        if report_type in [1, 2]:
+            _logger.debug("tests_status_dkt:\n%s", pformat(tests_status_dkt, indent=4))
 
 
 ####################################################################################################
@@ -4,12 +4,44 @@
 """SQLite module."""
 
 
+import logging
 import sqlite3
+import threading
+
+from itertools import islice
+from typing import NamedTuple
+
+
+_logger = logging.getLogger("sdet")
+
+
+class SdetRow(NamedTuple):
+    """Row of the SDET table; fields in the order of the table header. Being a tuple, it is inserted as is."""
+
+    detail_info: str
+    no_of_executed_tests: int
+    no_of_failed_tests: int
+    list_of_ids: str
+    run_status: str
 
 
 class Sqlite(object):
     """SQLIte related tasks."""
 
+    # Max number of rows handed to the driver at once by 'insert_into_db()'
+    INSERT_CHUNK_SIZE = 1000
+    # Number of rows fetched at a time by 'iter_query_db()'
+    FETCH_SIZE = 1000
+    # Applied to every new connection: WAL journal (a commit is a sequential append), no fsync on every commit
+    # (still crash-safe in WAL mode), in-memory temp tables, ~64MB page cache, memory-mapped reads
+    CONNECTION_PRAGMAS = (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA cache_size=-64000;"
+        "PRAGMA mmap_size=268435456;"
+    )
+
     def __init__(self, sqlite_file=None) -> None:
         """Initialize the SQLite instance.
         :param sqlite_file: Path to the SQLite file [str]
@@ -17,6 +49,13 @@ class Sqlite(object):
         self.__sqlite_file = sqlite_file
         self.__table_name = 'SDET'
         self.__table_header = 'Detail_Info,No_of_Executed_Tests,No_of_Failed_Tests,List_of_IDs,Run_Status'
+        # Constant for the lifetime of the instance: one placeholder per column of the header
+        self.__insert_sql = 'INSERT INTO MAIN.{table}({header}) VALUES ({placeholders})'.format(
+            table=self.__table_name, header=self.__table_header,
+            placeholders=','.join('?' * (self.__table_header.count(',') + 1))
+        )
+        # Connections are bound to the thread that opened them: one long-lived connection per thread
+        self.__local = threading.local()
 
     @property
     def sqlite_file(self) -> str:
@@ -35,17 +74,44 @@ class Sqlite(object):
 
     ################################################################################################
     def connect(self):
-        """Connect to DB
+        """Connect to DB; the connection is opened once per thread and reused by later calls.
         :return: Connection, on success
                  None, on failure
         """
+
+        conn = getattr(self.__local, 'connection', None)
+        if conn is not None:
+            return conn
+
         try:
             conn = sqlite3.connect(self.sqlite_file, detect_types=sqlite3.PARSE_DECLTYPES)
         except Exception as error:
-            print("\nError when trying to connect to database: {db}\n\t{err}\n".format(db=self.sqlite_file, err=error))
+            _logger.error("Error when trying to connect to database: %s\n\t%s", self.sqlite_file, error,
+                          exc_info=_logger.isEnabledFor(logging.DEBUG))
             return
-        else:
-            return conn
+
+        # Tuning only: the DB is still usable with the default settings (e.g.: WAL not supported by the file system)
+        try:
+            conn.executescript(self.CONNECTION_PRAGMAS)
+        except Exception as error:
+            _logger.warning("Could not tune the database connection: %s\n\t%s", self.sqlite_file, error,
+                            exc_info=_logger.isEnabledFor(logging.DEBUG))
+
+        self.__local.connection = conn
+        return conn
+
+    ################################################################################################
+    def close(self) -> None:
+        """Close the DB connection of the current thread (if any).
+        Closing the last connection checkpoints the WAL and removes its side files ('-wal', '-shm').
+        """
+
+        conn = getattr(self.__local, 'connection', None)
+        if conn is None:
+            return
+
+        self.__local.connection = None
+        conn.close()
 
     ################################################################################################
     def query_db(self, sql_query: str = None):
@@ -56,56 +122,148 @@ class Sqlite(object):
                 None, if no input provided
         """
 
+        rows = self.iter_query_db(sql_query=sql_query)
+        if not rows:
+            return rows
+
+        try:
+            return list(rows)
+        except Exception as err:
+            _logger.error("Error when trying to query table: [%s]\n\t%s", self.table_name, err,
+                          exc_info=_logger.isEnabledFor(logging.DEBUG))
+            return False
+
+    ################################################################################################
+    def iter_query_db(self, sql_query: str = None):
+        """Select values from DB, streaming the rows (fetched 'FETCH_SIZE' at a time) instead of loading them all.
+        The query itself runs right away; the connection must stay open until the rows are consumed.
+        :param sql_query: Query to use [str]
+        :return Generator of ROWS, on success
+                False, on failure
+                None, if no input provided
+        """
+
         if not sql_query:
             return
 
         connection = self.connect()
-        with connection:
-            cursor = connection.cursor()
+        if connection is None:
+            return False
 
-            try:
-                cursor.execute(sql_query)
-            except Exception as err:
-                print("\nError when trying to query table: [{table}]\n\t{err}\n".format(table=self.table_name, err=err))
-                return False
-            else:
-                rows = cursor.fetchall()
+        # A plain read: no transaction to commit
+        try:
+            cursor = connection.execute(sql_query)
+        except Exception as err:
+            _logger.error("Error when trying to query table: [%s]\n\t%s", self.table_name, err,
+                          exc_info=_logger.isEnabledFor(logging.DEBUG))
+            return False
+
+        return self._iter_rows(cursor, self.FETCH_SIZE)
+
+    @staticmethod
+    def _iter_rows(cursor, fetch_size: int):
+        """Yield the rows of an executed query, one batch of rows fetched at a time.
+        :param cursor: Cursor of the executed query
+        :param fetch_size: Number of rows per batch [int]
+        """
 
-                return rows
+        try:
+            batch = cursor.fetchmany(fetch_size)
+            while batch:
+                yield from batch
+                batch = cursor.fetchmany(fetch_size)
+        finally:
+            cursor.close()
 
     ################################################################################################
-    def insert_into_db(self, values_to_insert: tuple = None):
-        """Insert values into DB.
-        :param values_to_insert: Values to insert [tuple]
+    def begin(self) -> bool:
+        """Open a transaction: the following inserts are committed together, by 'commit()' (or dropped by
+        'rollback()').
+        :return True, on success
+                False, on failure
+        """
+        return self._transaction_step('open', lambda connection: connection.execute("BEGIN"))
+
+    def commit(self) -> bool:
+        """Commit the open transaction (if any).
+        :return True, on success
+                False, on failure
+        """
+        return self._transaction_step('commit', sqlite3.Connection.commit)
+
+    def rollback(self) -> bool:
+        """Roll back the open transaction (if any).
         :return True, on success
                 False, on failure
+        """
+        return self._transaction_step('roll back', sqlite3.Connection.rollback)
+
+    def _transaction_step(self, action: str, step) -> bool:
+        """Run a transaction control step on the connection of the current thread.
+        :param action: What the step does, for the error message [str]
+        :param step: Function taking the connection
+        :return True, on success
+                False, on failure
+        """
+
+        connection = self.connect()
+        if connection is None:
+            return False
+
+        try:
+            step(connection)
+        except Exception as err:
+            _logger.error("Error when trying to %s a transaction on table: [%s]\n\t%s", action, self.table_name, err,
+                          exc_info=_logger.isEnabledFor(logging.DEBUG))
+            return False
+
+        return True
+
+    ################################################################################################
+    def insert_into_db(self, values_to_insert=None):
+        """Insert values into DB; several rows are inserted in a single transaction (one commit).
+        Inside a transaction opened by 'begin()', the rows are only inserted: the caller commits them.
+        :param values_to_insert: Values of one row [SdetRow/tuple/list] or rows to insert [sequence/iterable of them]
+        :return Number of inserted rows, on success
+                False, on failure
                 None, if no input provided
         """
 
         if not values_to_insert:
             return
 
-        sql_query = (
-            'INSERT INTO MAIN.{table}({header}) VALUES (?,?,?,?,?)'.format(table=self.table_name,
-                                                                           header=self.table_header)
-        )
+        # A single row: a flat sequence of values (as 'cursor.execute()' took it before)
+        if isinstance(values_to_insert, (tuple, list)) and not isinstance(values_to_insert[0], (tuple, list)):
+            values_to_insert = [values_to_insert]
+
+        inserted = 0
+        rows = iter(values_to_insert)
 
         connection = self.connect()
-        with connection:
-            cursor = connection.cursor()
-
-            try:
-                cursor.execute(sql_query, values_to_insert)
-            except Exception as err:
-                print(
-                    "\nError when trying to insert values into table: [{table}]\n\t{err}\n".format(
-                        table=self.table_name, err=err)
-                )
-                return False
-            else:
+        if connection is None:
+            return False
+
+        # No transaction open by the caller: this call is one on its own
+        own_transaction = not connection.in_transaction
+
+        try:
+            # Bounded chunks: a lazy iterable of rows is never fully materialized
+            chunk = list(islice(rows, self.INSERT_CHUNK_SIZE))
+            while chunk:
+                connection.executemany(self.__insert_sql, chunk)
+                inserted += len(chunk)
+                chunk = list(islice(rows, self.INSERT_CHUNK_SIZE))
+            if own_transaction:
                 connection.commit()
+        except Exception as err:
+            _logger.error("Error when trying to insert values into table: [%s]\n\t%s", self.table_name, err,
+                          exc_info=_logger.isEnabledFor(logging.DEBUG))
+            # Nothing of the batch is kept; the transaction of the caller is up to the caller
+            if own_transaction:
+                connection.rollback()
+            return False
 
-                return True
+        return inserted
 
 
 ####################################################################################################